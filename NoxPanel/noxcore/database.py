@@ -7,11 +7,12 @@ import sqlite3
 import logging
 import os
 import json
+import queue
 import threading
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
 from contextlib import contextmanager
-from typing import Optional, Dict, List, Any, Union
+from typing import Optional, Dict, List, Any, Union, NamedTuple
 import time
 
 from .utils.datetime_utils import utc_now
@@ -39,74 +40,141 @@ def log_access_attempt(endpoint: str, user_id: str = None, success: bool = True)
 
 logger = logging.getLogger(__name__)
 
+class _PooledConn(NamedTuple):
+    """Idle pool entry with its age bookkeeping (monotonic seconds)"""
+    conn: sqlite3.Connection
+    created_at: float
+    last_used: float
+
 class DatabaseConnectionPool:
     """SQLite connection pool for improved performance"""
     
-    def __init__(self, db_path: str, pool_size: int = 10, timeout: float = 30.0) -> None:
+    def __init__(self, db_path: str, pool_size: int = 10, timeout: float = 30.0,
+                 min_size: int = 1, max_lifetime: float = 3600.0,
+                 ping_interval: float = 5.0, synchronous: str = None) -> None:
+        if pool_size < 1:
+            raise ValueError(f"Invalid pool size: {pool_size}")
+        
+        if synchronous is None:
+            synchronous = os.getenv('NOX_DB_SYNCHRONOUS', 'NORMAL')
+        synchronous = synchronous.upper()
+        if synchronous not in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+            raise ValueError(f"Invalid synchronous mode: {synchronous}")
+        
         self.db_path = db_path
+        self.synchronous = synchronous
         self.pool_size = pool_size
+        self.min_size = min(min_size, pool_size)
         self.timeout = timeout
-        self._pool = []
-        self._lock = threading.Lock()
+        self.max_lifetime = max_lifetime
+        self.ping_interval = ping_interval
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._open_count = 0
+        self._count_lock = threading.Lock()
+        # created_at of checked-out connections, keyed by id(conn)
+        self._borrowed: Dict[int, float] = {}
         self._create_pool()
     
+    def _create_connection(self) -> sqlite3.Connection:
+        """Open a connection with the pool's standard PRAGMA settings"""
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            isolation_level=None,  # autocommit mode
+            timeout=self.timeout
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute("PRAGMA cache_size=10000")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        with self._count_lock:
+            self._open_count += 1
+        return conn
+    
+    def _close_connection(self, conn: sqlite3.Connection) -> None:
+        """Close a connection owned by the pool"""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._count_lock:
+            self._open_count -= 1
+    
     def _create_pool(self) -> Any:
-        """Initialize connection pool"""
-        for _ in range(self.pool_size):
-            conn = sqlite3.connect(
-                self.db_path,
-                check_same_thread=False,
-                isolation_level=None,  # autocommit mode
-                timeout=self.timeout
-            )
-            conn.execute("PRAGMA journal_mode=WAL")
-            conn.execute("PRAGMA synchronous=NORMAL")
-            conn.execute("PRAGMA cache_size=10000")
-            conn.execute("PRAGMA temp_store=MEMORY")
-            self._pool.append(conn)
+        """Warm the pool with min_size connections; the rest open on demand"""
+        for _ in range(self.min_size):
+            now = time.monotonic()
+            self._pool.put_nowait(_PooledConn(self._create_connection(), now, now))
+    
+    def _checkout(self, conn: sqlite3.Connection, created_at: float) -> sqlite3.Connection:
+        """Remember a connection's age while it is borrowed"""
+        with self._count_lock:
+            self._borrowed[id(conn)] = created_at
+        return conn
     
     def get_connection(self) -> sqlite3.Connection:
-        """Get connection from pool"""
-        with self._lock:
-            if self._pool:
-                return self._pool.pop()
-            else:
-                # Create new connection if pool is empty
-                conn = sqlite3.connect(
-                    self.db_path,
-                    check_same_thread=False,
-                    isolation_level=None,
-                    timeout=self.timeout
-                )
-                conn.execute("PRAGMA journal_mode=WAL")
-                return conn
+        """Get connection from pool, recycling expired or unhealthy ones"""
+        while True:
+            try:
+                entry = self._pool.get_nowait()
+            except queue.Empty:
+                # Pool exhausted: open an overflow connection
+                return self._checkout(self._create_connection(), time.monotonic())
+            
+            now = time.monotonic()
+            if now - entry.created_at > self.max_lifetime:
+                self._close_connection(entry.conn)
+                continue
+            
+            # Only health-check connections that have sat idle for a while
+            if now - entry.last_used >= self.ping_interval:
+                try:
+                    entry.conn.execute("SELECT 1").fetchone()
+                except sqlite3.Error:
+                    self._close_connection(entry.conn)
+                    continue
+            
+            return self._checkout(entry.conn, entry.created_at)
     
     def return_connection(self, conn: sqlite3.Connection) -> Any:
         """Return connection to pool"""
+        now = time.monotonic()
+        with self._count_lock:
+            created_at = self._borrowed.pop(id(conn), now)
+        
+        if now - created_at > self.max_lifetime:
+            self._close_connection(conn)
+            return
+        
+        # Cheap sanity check: never hand out a closed or mid-transaction connection
         try:
-            # Test connection health
-            conn.execute("SELECT 1").fetchone()
-            with self._lock:
-                if len(self._pool) < self.pool_size:
-                    self._pool.append(conn)
-                else:
-                    conn.close()
+            if conn.in_transaction:
+                conn.rollback()
         except sqlite3.Error:
-            # Connection is unhealthy, close it
-            try:
-                conn.close()
-            except Exception:
-                pass
+            # ProgrammingError on a closed connection, or a failed rollback
+            self._close_connection(conn)
+            return
+        
+        try:
+            self._pool.put_nowait(_PooledConn(conn, created_at, now))
+        except queue.Full:
+            self._close_connection(conn)
     
     def close_all(self) -> Any:
         """Close all connections in pool"""
-        with self._lock:
-            for conn in self._pool:
-                try:
-                    conn.close()
-                except Exception:
-                    pass
-            self._pool.clear()
+        while True:
+            try:
+                entry = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            self._close_connection(entry.conn)
+    
+    def stats(self) -> Dict[str, int]:
+        """Get open, idle and in-use connection counts"""
+        idle = self._pool.qsize()
+        with self._count_lock:
+            open_count = self._open_count
+        return {'open': open_count, 'idle': idle, 'in_use': open_count - idle}
 
 class NoxDatabase:
     """Enhanced database manager for NoxGuard---NoxPanel system"""
@@ -137,6 +205,36 @@ class NoxDatabase:
         finally:
             self.pool.return_connection(conn)
     
+    @contextmanager
+    def transaction(self) -> Any:
+        """Context manager for a connection inside an explicit transaction"""
+        with self.get_connection() as conn:
+            conn.execute("BEGIN")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            finally:
+                # Covers BaseException in the body and a failed COMMIT alike
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+    
+    @contextmanager
+    def read_only_connection(self, mmap_size: int = 268435456) -> Any:
+        """Context manager for a dedicated read-only connection for bulk scans"""
+        conn = sqlite3.connect(
+            f"{self.db_path.resolve().as_uri()}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+            timeout=self.pool.timeout
+        )
+        try:
+            conn.row_factory = sqlite3.Row
+            conn.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+            conn.execute("PRAGMA cache_size=-65536")  # 64 MiB
+            yield conn
+        finally:
+            conn.close()
+    
     def init_database(self) -> Any:
         """Initialize complete database schema"""
         try:
@@ -436,9 +534,11 @@ class NoxDatabase:
             CREATE INDEX IF NOT EXISTS idx_sessions_last_activity ON sessions (last_activity);
             
             -- Audit log indexes
-            CREATE INDEX IF NOT EXISTS idx_audit_user ON audit_logs (user_id);
             CREATE INDEX IF NOT EXISTS idx_audit_action ON audit_logs (action);
             CREATE INDEX IF NOT EXISTS idx_audit_timestamp ON audit_logs (timestamp);
+            DROP INDEX IF EXISTS idx_audit_ts_action;  -- no query reads it; only slowed inserts
+            CREATE INDEX IF NOT EXISTS idx_audit_user_action ON audit_logs (user_id, action, timestamp);
+            DROP INDEX IF EXISTS idx_audit_user;  -- left prefix of idx_audit_user_action
             CREATE INDEX IF NOT EXISTS idx_audit_resource ON audit_logs (resource_type, resource_id);
         """)
     
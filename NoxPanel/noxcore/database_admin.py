@@ -42,6 +42,10 @@ def log_access_attempt(endpoint: str, user_id: str = None, success: bool = True)
 
 logger = logging.getLogger(__name__)
 
+def _quote_identifier(name: str) -> str:
+    """Quote an SQLite identifier (table/column name) for interpolation"""
+    return '"' + name.replace('"', '""') + '"'
+
 class DatabaseAdmin:
     """Database administration utilities"""
     
@@ -86,7 +90,7 @@ class DatabaseAdmin:
                     SELECT id, username, email, role, created_at, last_login, active
                     FROM users ORDER BY created_at DESC
                 """)
-                return [dict(row) for row in cursor.fetchall()]
+                return [dict(row) for row in cursor]
         except Exception as e:
             logger.error(f"Failed to list users: {e}")
             return []
@@ -142,24 +146,24 @@ class DatabaseAdmin:
             
             data = {}
             
-            with self.db_service.db.get_connection() as conn:
+            with self.db_service.db.read_only_connection() as conn:
                 cursor = conn.cursor()
                 
                 if table:
                     # Export specific table
-                    cursor.execute(f"SELECT * FROM {table}")
-                    data[table] = [dict(row) for row in cursor.fetchall()]
+                    cursor.execute(f"SELECT * FROM {_quote_identifier(table)}")
+                    data[table] = [dict(row) for row in cursor]
                 else:
                     # Export all tables
                     cursor.execute("""
                         SELECT name FROM sqlite_master 
                         WHERE type='table' AND name NOT LIKE 'sqlite_%'
                     """)
-                    tables = [row[0] for row in cursor.fetchall()]
+                    tables = [row[0] for row in cursor]
                     
                     for table_name in tables:
-                        cursor.execute(f"SELECT * FROM {table_name}")
-                        data[table_name] = [dict(row) for row in cursor.fetchall()]
+                        cursor.execute(f"SELECT * FROM {_quote_identifier(table_name)}")
+                        data[table_name] = [dict(row) for row in cursor]
             
             # Add metadata
             data['_metadata'] = {
@@ -184,24 +188,11 @@ class DatabaseAdmin:
             with open(import_path, 'r') as f:
                 data = json.load(f)
             
-            imported_count = 0
-            
-            if 'knowledge_items' in data:
-                for item in data['knowledge_items']:
-                    knowledge_id = self.db_service.knowledge.create_knowledge_item(
-                        title=item.get('title', ''),
-                        content=item.get('content', ''),
-                        category=item.get('category', 'imported'),
-                        author_id=item.get('author_id'),
-                        content_type=item.get('content_type', 'text'),
-                        source=item.get('source'),
-                        source_url=item.get('source_url'),
-                        metadata=item.get('metadata', {}),
-                        search_keywords=item.get('search_keywords', '')
-                    )
-                    
-                    if knowledge_id:
-                        imported_count += 1
+            items = [
+                dict(item, category=item.get('category', 'imported'))
+                for item in data.get('knowledge_items', [])
+            ]
+            imported_count = self.db_service.knowledge.create_knowledge_items(items)
             
             logger.info(f"Imported {imported_count} knowledge items")
             return imported_count
@@ -3,9 +3,12 @@ Database Service for NoxGuard---NoxPanel
 High-level service that orchestrates database operations
 """
 
+import copy
 import logging
 import os
 import json
+import threading
+import time
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Optional, Dict, List, Any, Union
@@ -43,13 +46,20 @@ logger = logging.getLogger(__name__)
 class DatabaseService:
     """Main database service for NoxGuard---NoxPanel"""
     
-    def __init__(self, db_path: str = None, auto_migrate: bool = True, pool_size: int = 10) -> None:
+    def __init__(self, db_path: str = None, auto_migrate: bool = True, pool_size: int = None) -> None:
         """Initialize database service"""
         if db_path is None:
             db_path = os.getenv('NOX_DB_PATH', 'data/db/noxpanel.db')
+        if pool_size is None:
+            pool_size = int(os.getenv('NOX_DB_POOL_SIZE', '10'))
         
         self.db_path = db_path
         self.auto_migrate = auto_migrate
+        self.pool_size = pool_size
+        
+        # Last health probe as (monotonic timestamp, metrics)
+        self._health_cache = None
+        self._health_lock = threading.Lock()
         
         # Initialize database
         self.db = NoxDatabase(db_path, pool_size)
@@ -97,27 +107,22 @@ class DatabaseService:
             with self.db.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Get table counts
-                table_counts = {}
+                # Table counts, recent activity and size in a single round-trip
                 tables = [
                     'users', 'devices', 'knowledge_items', 'tags', 
                     'conversations', 'conversation_messages', 'sessions'
                 ]
+                counts_sql = ", ".join(f"(SELECT COUNT(*) FROM {table})" for table in tables)
                 
-                for table in tables:
-                    cursor.execute(f"SELECT COUNT(*) FROM {table}")
-                    table_counts[table] = cursor.fetchone()[0]
-                
-                # Get database size
-                cursor.execute("SELECT page_count * page_size as size FROM pragma_page_count(), pragma_page_size()")
-                db_size = cursor.fetchone()[0]
-                
-                # Get recent activity
-                cursor.execute("""
-                    SELECT COUNT(*) FROM audit_logs 
-                    WHERE timestamp > datetime('now', '-24 hours')
+                cursor.execute(f"""
+                    SELECT {counts_sql},
+                        (SELECT COUNT(*) FROM audit_logs
+                         WHERE timestamp > datetime('now', '-24 hours')),
+                        (SELECT page_count * page_size
+                         FROM pragma_page_count(), pragma_page_size())
                 """)
-                recent_activity = cursor.fetchone()[0]
+                *counts, recent_activity, db_size = cursor.fetchone()
+                table_counts = dict(zip(tables, counts))
                 
                 return {
                     'database_path': str(self.db_path),
@@ -188,9 +193,10 @@ class DatabaseService:
             
             # Restore from backup
             shutil.copy2(backup_path, self.db_path)
+            self._health_cache = None
             
             # Reinitialize database
-            self.db = NoxDatabase(self.db_path)
+            self.db = NoxDatabase(self.db_path, self.pool_size)
             
             # Verify restored database
             if self.migration_manager.validate_schema():
@@ -199,7 +205,7 @@ class DatabaseService:
             else:
                 # Restore failed, rollback
                 shutil.copy2(current_backup, self.db_path)
-                self.db = NoxDatabase(self.db_path)
+                self.db = NoxDatabase(self.db_path, self.pool_size)
                 logger.error("Database restore failed validation, rolled back")
                 return False
                 
@@ -234,7 +240,8 @@ class DatabaseService:
         """Clean up old data based on retention policy"""
         try:
             cleanup_stats = {}
-            cutoff_date = datetime.now() - timedelta(days=days)
+            now = datetime.now()
+            cutoff = (now - timedelta(days=days)).isoformat()
             
             with self.db.get_connection() as conn:
                 cursor = conn.cursor()
@@ -243,14 +250,14 @@ class DatabaseService:
                 cursor.execute("""
                     DELETE FROM audit_logs 
                     WHERE timestamp < ?
-                """, (cutoff_date.isoformat(),))
+                """, (cutoff,))
                 cleanup_stats['audit_logs'] = cursor.rowcount
                 
                 # Clean up expired sessions
                 cursor.execute("""
                     DELETE FROM sessions 
                     WHERE expires_at < ? OR last_activity < ?
-                """, (datetime.now().isoformat(), cutoff_date.isoformat()))
+                """, (now.isoformat(), cutoff))
                 cleanup_stats['sessions'] = cursor.rowcount
                 
                 # Clean up old conversation messages (keep conversations but remove old messages)
@@ -259,7 +266,7 @@ class DatabaseService:
                     WHERE timestamp < ? AND conversation_id IN (
                         SELECT id FROM conversations WHERE ended_at < ?
                     )
-                """, (cutoff_date.isoformat(), cutoff_date.isoformat()))
+                """, (cutoff, cutoff))
                 cleanup_stats['conversation_messages'] = cursor.rowcount
                 
                 # Clean up orphaned data
@@ -276,8 +283,25 @@ class DatabaseService:
             logger.error(f"Data cleanup failed: {e}")
             return {}
     
-    def get_health_metrics(self) -> Dict[str, Any]:
-        """Get database health metrics"""
+    def get_health_metrics(self, max_age: float = 1.0) -> Dict[str, Any]:
+        """Get database health metrics
+        
+        Probes younger than max_age seconds are served from cache so that
+        frequent liveness checks do not rerun PRAGMA integrity_check.
+        """
+        with self._health_lock:
+            if self._health_cache and time.monotonic() - self._health_cache[0] < max_age:
+                return copy.deepcopy(self._health_cache[1])
+        
+        metrics = self._probe_health()
+        
+        with self._health_lock:
+            self._health_cache = (time.monotonic(), metrics)
+        
+        return copy.deepcopy(metrics)
+    
+    def _probe_health(self) -> Dict[str, Any]:
+        """Run the database health probe"""
         try:
             with self.db.get_connection() as conn:
                 cursor = conn.cursor()
@@ -299,7 +323,8 @@ class DatabaseService:
                 lock_status = cursor.fetchall()
                 
                 # Get active connections (estimated)
-                active_connections = len(self.db.pool._pool)
+                pool_stats = self.db.pool.stats()
+                active_connections = pool_stats['in_use']
                 
                 return {
                     'integrity_check': integrity_result,
@@ -308,8 +333,9 @@ class DatabaseService:
                     'lock_status': lock_status,
                     'connection_pool': {
                         'active_connections': active_connections,
+                        'open_connections': pool_stats['open'],
                         'pool_size': self.db.pool.pool_size,
-                        'utilization': round((self.db.pool.pool_size - active_connections) / self.db.pool.pool_size * 100, 2)
+                        'utilization': round(active_connections / self.db.pool.pool_size * 100, 2)
                     },
                     'health_status': 'healthy' if integrity_result == 'ok' else 'warning',
                     'checked_at': datetime.now().isoformat()
@@ -5,6 +5,7 @@ Provides high-level interfaces for database operations
 
 import logging
 import json
+import sqlite3
 import hashlib
 import uuid
 from datetime import datetime, timedelta
@@ -86,15 +87,16 @@ class UserRepository(BaseRepository):
     
     def get_user(self, user_id: int = None, username: str = None) -> Optional[Dict[str, Any]]:
         """Get user by ID or username"""
+        if not (user_id or username):
+            return None
+        
         try:
             with self.db.get_connection() as conn:
                 cursor = conn.cursor()
                 if user_id:
                     cursor.execute("SELECT * FROM users WHERE id = ? AND active = 1", (user_id,))
-                elif username:
-                    cursor.execute("SELECT * FROM users WHERE username = ? AND active = 1", (username,))
                 else:
-                    return None
+                    cursor.execute("SELECT * FROM users WHERE username = ? AND active = 1", (username,))
                 
                 row = cursor.fetchone()
                 if row:
@@ -159,6 +161,56 @@ class KnowledgeRepository(BaseRepository):
             logger.error(f"Failed to create knowledge item: {e}")
             return None
     
+    def create_knowledge_items(self, items: List[Dict[str, Any]]) -> int:
+        """Create multiple knowledge items in a single transaction"""
+        try:
+            rows = [
+                (
+                    item.get('title', ''),
+                    item.get('content', ''),
+                    item.get('content_type', 'text'),
+                    item.get('category', 'general'),
+                    item.get('source'),
+                    item.get('source_url'),
+                    item.get('author_id'),
+                    self._serialize_json(item.get('metadata', {})),
+                    item.get('search_keywords', '')
+                )
+                for item in items
+            ]
+            if not rows:
+                return 0
+            
+            with self.db.transaction() as conn:
+                conn.executemany("""
+                    INSERT INTO knowledge_items 
+                    (title, content, content_type, category, source, source_url, 
+                     author_id, metadata, search_keywords)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+                return len(rows)
+        except sqlite3.IntegrityError as e:
+            # One bad row aborts the batch; retry item by item so the rest still land
+            logger.warning(f"Bulk knowledge insert failed ({e}), retrying items individually")
+            created = 0
+            for index, item in enumerate(items):
+                fields = dict(item)
+                item_id = self.create_knowledge_item(
+                    title=fields.pop('title', ''),
+                    content=fields.pop('content', ''),
+                    category=fields.pop('category', 'general'),
+                    author_id=fields.pop('author_id', None),
+                    **fields
+                )
+                if item_id:
+                    created += 1
+                else:
+                    logger.warning(f"Skipped knowledge item {index} ({item.get('title')!r})")
+            return created
+        except Exception as e:
+            logger.error(f"Failed to create knowledge items: {e}")
+            return 0
+    
     def get_knowledge_item(self, item_id: int) -> Optional[Dict[str, Any]]:
         """Get knowledge item by ID"""
         try:
@@ -215,7 +267,7 @@ class KnowledgeRepository(BaseRepository):
                 
                 cursor.execute(sql, params)
                 items = []
-                for row in cursor.fetchall():
+                for row in cursor:
                     item = dict(row)
                     item['metadata'] = self._deserialize_json(item['metadata'])
                     items.append(item)
@@ -235,7 +287,7 @@ class KnowledgeRepository(BaseRepository):
                     WHERE status = 'active' 
                     ORDER BY category
                 """)
-                return [row[0] for row in cursor.fetchall()]
+                return [row[0] for row in cursor]
         except Exception as e:
             logger.error(f"Failed to get knowledge categories: {e}")
             return []
@@ -260,15 +312,16 @@ class TagRepository(BaseRepository):
     
     def get_tag(self, tag_id: int = None, name: str = None) -> Optional[Dict[str, Any]]:
         """Get tag by ID or name"""
+        if not (tag_id or name):
+            return None
+        
         try:
             with self.db.get_connection() as conn:
                 cursor = conn.cursor()
                 if tag_id:
                     cursor.execute("SELECT * FROM tags WHERE id = ?", (tag_id,))
-                elif name:
-                    cursor.execute("SELECT * FROM tags WHERE name = ?", (name,))
                 else:
-                    return None
+                    cursor.execute("SELECT * FROM tags WHERE name = ?", (name,))
                 
                 row = cursor.fetchone()
                 return dict(row) if row else None
@@ -279,7 +332,7 @@ class TagRepository(BaseRepository):
     def add_tag_to_knowledge_item(self, knowledge_item_id: int, tag_id: int) -> bool:
         """Add tag to knowledge item"""
         try:
-            with self.db.get_connection() as conn:
+            with self.db.transaction() as conn:
                 conn.execute("""
                     INSERT OR IGNORE INTO knowledge_item_tags (knowledge_item_id, tag_id)
                     VALUES (?, ?)
@@ -320,7 +373,7 @@ class ConversationRepository(BaseRepository):
                    model_name: str = None) -> Optional[int]:
         """Add message to conversation"""
         try:
-            with self.db.get_connection() as conn:
+            with self.db.transaction() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     INSERT INTO conversation_messages 
@@ -367,7 +420,7 @@ class ConversationRepository(BaseRepository):
                     """, (conversation_id,))
                     
                     messages = []
-                    for msg_row in cursor.fetchall():
+                    for msg_row in cursor:
                         message = dict(msg_row)
                         message['metadata'] = self._deserialize_json(message['metadata'])
                         messages.append(message)
@@ -395,7 +448,7 @@ class ConversationRepository(BaseRepository):
                 """, (user_id, limit))
                 
                 conversations = []
-                for row in cursor.fetchall():
+                for row in cursor:
                     conv = dict(row)
                     conv['metadata'] = self._deserialize_json(conv['metadata'])
                     conversations.append(conv)
@@ -472,6 +525,7 @@ class SessionRepository(BaseRepository):
     def cleanup_expired_sessions(self) -> int:
         """Clean up expired sessions"""
         try:
+            now = datetime.now()
             with self.db.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
@@ -479,8 +533,8 @@ class SessionRepository(BaseRepository):
                     SET active = 0 
                     WHERE expires_at <= ? OR last_activity <= ?
                 """, (
-                    datetime.now().isoformat(),
-                    (datetime.now() - timedelta(days=7)).isoformat()
+                    now.isoformat(),
+                    (now - timedelta(days=7)).isoformat()
                 ))
                 return cursor.rowcount
         except Exception as e:
@@ -509,6 +563,35 @@ class AuditRepository(BaseRepository):
             logger.error(f"Failed to log audit action: {e}")
             return False
     
+    def log_actions(self, entries: List[Dict[str, Any]]) -> int:
+        """Log multiple audit actions in a single transaction"""
+        try:
+            rows = [
+                (
+                    entry.get('user_id'),
+                    entry.get('action'),
+                    entry.get('resource_type'),
+                    entry.get('resource_id'),
+                    self._serialize_json(entry.get('details') or {}),
+                    entry.get('ip_address'),
+                    entry.get('user_agent')
+                )
+                for entry in entries
+            ]
+            if not rows:
+                return 0
+            
+            with self.db.transaction() as conn:
+                conn.executemany("""
+                    INSERT INTO audit_logs 
+                    (user_id, action, resource_type, resource_id, details, ip_address, user_agent)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+                return len(rows)
+        except Exception as e:
+            logger.error(f"Failed to log audit actions: {e}")
+            return 0
+    
     def get_audit_logs(self, user_id: int = None, action: str = None,
                       limit: int = 100) -> List[Dict[str, Any]]:
         """Get audit logs with optional filtering"""
@@ -538,7 +621,7 @@ class AuditRepository(BaseRepository):
                 cursor.execute(sql, params)
                 
                 logs = []
-                for row in cursor.fetchall():
+                for row in cursor:
                     log = dict(row)
                     log['details'] = self._deserialize_json(log['details'])
                     logs.append(log)
@@ -39,6 +39,9 @@ def log_access_attempt(endpoint: str, user_id: str = None, success: bool = True)
 
 logger = logging.getLogger(__name__)
 
+# Compiled once: matched against every line of every analyzed file
+_LOGGING_FSTRING_RE = re.compile(r'logger\.\w+\(f["\']')
+
 
 class IssueType(Enum):
     """Types of code issues that can be detected."""
@@ -62,7 +65,7 @@ class IssueSeverity(Enum):
     INFO = "info"
 
 
-@dataclass
+@dataclass(slots=True)
 class CodeIssue:
     """Represents a code issue found during analysis."""
     file_path: str
@@ -163,6 +166,12 @@ class CodeAnalyzer:
         self.file_count = 0
         self.line_count = 0
         
+        # One pass over a line tells us whether any pattern can match at all
+        self._pattern_prefilter = re.compile('|'.join(
+            re.escape(pattern)
+            for pattern in [*self.DEPRECATED_PATTERNS, *self.SECURITY_PATTERNS]
+        ))
+        
     def analyze_file(self, file_path: Path) -> List[CodeIssue]:
         """Analyze a single Python file.
         
@@ -328,6 +337,9 @@ class CodeAnalyzer:
             return issues
         
         for line_num, line in enumerate(lines, 1):
+            if not self._pattern_prefilter.search(line):
+                continue
+            
             stripped_line = line.strip()
             
             # Skip comments, docstrings, and dictionary definitions
@@ -445,7 +457,7 @@ class CodeAnalyzer:
                 has_logger_creation = True
             
             # Check for f-string in logging
-            if re.search(r'logger\.\w+\(f["\']', line):
+            if _LOGGING_FSTRING_RE.search(line):
                 issues.append(CodeIssue(
                     file_path=file_path,
                     line_number=line_num,
@@ -492,21 +504,18 @@ class CodeAnalyzer:
                 '*/backup_*/*', '*/old/*', '*/tmp/*', '*/temp/*'
             ]
         
+        # Convert glob patterns to simple string matching once, not per file
+        exclude_strings = [
+            pattern.replace('*/', '').replace('/*', '').replace('*', '')
+            for pattern in exclude_patterns
+        ]
+        
         all_issues = []
         
         for py_file in directory.rglob('*.py'):
             # Check if file should be excluded
-            skip_file = False
             file_str = str(py_file)
-            
-            for pattern in exclude_patterns:
-                # Convert glob pattern to simple string matching
-                pattern_str = pattern.replace('*/', '').replace('/*', '').replace('*', '')
-                if pattern_str in file_str:
-                    skip_file = True
-                    break
-            
-            if skip_file:
+            if any(pattern_str in file_str for pattern_str in exclude_strings):
                 continue
             
             issues = self.analyze_file(py_file)
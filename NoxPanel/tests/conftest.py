@@ -0,0 +1,14 @@
+"""
+Shared pytest configuration for NoxPanel tests
+"""
+
+import os
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def fast_sqlite_sync(monkeypatch):
+    """Skip fsyncs for throwaway test databases; restored after each test"""
+    if 'NOX_DB_SYNCHRONOUS' not in os.environ:
+        monkeypatch.setenv('NOX_DB_SYNCHRONOUS', 'OFF')
@@ -4,12 +4,14 @@ Tests all database components including schema, migrations, and operations
 """
 
 import unittest
+import sqlite3
 import tempfile
 import os
 import json
 import shutil
 from pathlib import Path
 from datetime import datetime, timedelta
+from unittest import mock
 
 # Import our database components
 import sys
@@ -21,9 +23,42 @@ from noxcore.repositories import (
     UserRepository, KnowledgeRepository, TagRepository,
     ConversationRepository, SessionRepository, AuditRepository
 )
-from noxcore.database_service import DatabaseService
+from noxcore.database_service import DatabaseService, close_database_service
 from noxcore.database_admin import DatabaseAdmin
 
+# Schema + default data built once per module, copied into each repository test's file
+_template_db = None
+
+def setUpModule():
+    """Build the in-memory template database"""
+    global _template_db
+    
+    temp_dir = tempfile.mkdtemp()
+    try:
+        template = NoxDatabase(os.path.join(temp_dir, 'template.db'))
+        with template.get_connection() as conn:
+            _template_db = sqlite3.connect(':memory:', check_same_thread=False)
+            conn.backup(_template_db)
+        template.close()
+    finally:
+        shutil.rmtree(temp_dir)
+
+def tearDownModule():
+    """Close the in-memory template database"""
+    global _template_db
+    
+    if _template_db is not None:
+        _template_db.close()
+        _template_db = None
+
+def _clone_template_db(db_path):
+    """Seed db_path with the template database via the SQLite backup API"""
+    target = sqlite3.connect(db_path)
+    try:
+        _template_db.backup(target)
+    finally:
+        target.close()
+
 class TestDatabaseConnectionPool(unittest.TestCase):
     """Test database connection pool functionality"""
     
@@ -40,7 +75,18 @@ class TestDatabaseConnectionPool(unittest.TestCase):
         """Test connection pool is created correctly"""
         self.assertEqual(self.pool.pool_size, 3)
         self.assertIsNotNone(self.pool._pool)
-    
+
+    def test_lazy_connection_creation(self):
+        """Test connections beyond min_size are opened on demand"""
+        self.assertEqual(self.pool.stats(), {'open': 1, 'idle': 1, 'in_use': 0})
+
+        conns = [self.pool.get_connection() for _ in range(2)]
+        self.assertEqual(self.pool.stats(), {'open': 2, 'idle': 0, 'in_use': 2})
+
+        for conn in conns:
+            self.pool.return_connection(conn)
+        self.assertEqual(self.pool.stats(), {'open': 2, 'idle': 2, 'in_use': 0})
+
     def test_get_return_connection(self):
         """Test getting and returning connections"""
         conn = self.pool.get_connection()
@@ -54,6 +100,68 @@ class TestDatabaseConnectionPool(unittest.TestCase):
         # Return connection
         self.pool.return_connection(conn)
 
+    def test_overflow_connection_settings(self):
+        """Test overflow connections use the same PRAGMA settings as pooled ones"""
+        conns = [self.pool.get_connection() for _ in range(self.pool.pool_size + 1)]
+        overflow = conns[-1]
+
+        self.assertEqual(overflow.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+        self.assertEqual(
+            overflow.execute("PRAGMA synchronous").fetchone(),
+            conns[0].execute("PRAGMA synchronous").fetchone()
+        )
+
+        for conn in conns:
+            self.pool.return_connection(conn)
+
+    def test_invalid_pool_size(self):
+        """Test a non-positive pool size is rejected"""
+        with self.assertRaises(ValueError):
+            DatabaseConnectionPool(self.db_path, pool_size=0)
+
+    def test_synchronous_mode(self):
+        """Test the synchronous PRAGMA is configurable and validated"""
+        pool = DatabaseConnectionPool(self.db_path, pool_size=1, synchronous='full')
+        conn = pool.get_connection()
+        self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 2)  # FULL
+        pool.return_connection(conn)
+        pool.close_all()
+
+        with self.assertRaises(ValueError):
+            DatabaseConnectionPool(self.db_path, synchronous='NORMAL; DROP TABLE users')
+
+    def test_connection_recycling(self):
+        """Test connections past max_lifetime or failing the idle ping are replaced"""
+        pool = DatabaseConnectionPool(self.db_path, pool_size=2, max_lifetime=-1)
+        conn = pool.get_connection()
+        pool.return_connection(conn)
+        self.assertEqual(pool.stats()['open'], 0)
+        pool.close_all()
+
+        pool = DatabaseConnectionPool(self.db_path, pool_size=2, ping_interval=0.0)
+        stale = pool.get_connection()
+        pool.return_connection(stale)
+        stale.close()
+        conn = pool.get_connection()
+        self.assertIsNot(conn, stale)
+        self.assertEqual(conn.execute("SELECT 1").fetchone()[0], 1)
+        pool.return_connection(conn)
+        pool.close_all()
+
+    def test_return_discards_bad_connections(self):
+        """Test closed connections are dropped and open transactions rolled back on return"""
+        conn = self.pool.get_connection()
+        conn.close()
+        self.pool.return_connection(conn)
+        self.assertEqual(self.pool.stats(), {'open': 0, 'idle': 0, 'in_use': 0})
+
+        conn = self.pool.get_connection()
+        conn.execute("BEGIN")
+        self.pool.return_connection(conn)
+        self.assertFalse(conn.in_transaction)
+        self.assertIs(self.pool.get_connection(), conn)
+        self.pool.return_connection(conn)
+
 class TestNoxDatabase(unittest.TestCase):
     """Test core database functionality"""
     
@@ -107,6 +215,38 @@ class TestNoxDatabase(unittest.TestCase):
             self.assertIsNotNone(version)
             self.assertEqual(version[0], '1')
 
+    def test_transaction_rollback(self):
+        """Test failed transactions leave no partial writes"""
+        with self.assertRaises(sqlite3.IntegrityError):
+            with self.db.transaction() as conn:
+                conn.execute("INSERT INTO tags (name) VALUES ('rollback-test')")
+                conn.execute("INSERT INTO tags (name) VALUES ('rollback-test')")
+
+        with self.db.get_connection() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM tags WHERE name = 'rollback-test'").fetchone()[0]
+            self.assertEqual(count, 0)
+
+    def test_transaction_rollback_on_base_exception(self):
+        """Test non-Exception errors also roll back and free the connection"""
+        with self.assertRaises(KeyboardInterrupt):
+            with self.db.transaction() as conn:
+                conn.execute("INSERT INTO tags (name) VALUES ('interrupted')")
+                raise KeyboardInterrupt
+        
+        self.assertFalse(conn.in_transaction)
+        with self.db.transaction() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM tags WHERE name = 'interrupted'").fetchone()[0]
+            self.assertEqual(count, 0)
+
+    def test_read_only_connection(self):
+        """Test read-only connections see committed data but reject writes"""
+        with self.db.read_only_connection() as conn:
+            users = conn.execute("SELECT username FROM users").fetchall()
+            self.assertIn('admin', [row['username'] for row in users])
+
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute("INSERT INTO tags (name) VALUES ('read-only-test')")
+
 class TestMigrationManager(unittest.TestCase):
     """Test migration system functionality"""
     
@@ -156,6 +296,7 @@ class TestUserRepository(unittest.TestCase):
     def setUp(self):
         self.temp_dir = tempfile.mkdtemp()
         self.db_path = os.path.join(self.temp_dir, 'test.db')
+        _clone_template_db(self.db_path)
         self.db = NoxDatabase(self.db_path)
         self.user_repo = UserRepository(self.db)
     
@@ -189,6 +330,11 @@ class TestUserRepository(unittest.TestCase):
         user = self.user_repo.get_user(username='testuser')
         self.assertIsNotNone(user)
         self.assertEqual(user['id'], user_id)
+        
+        # No key: answered without borrowing a connection
+        before = self.db.pool.stats()
+        self.assertIsNone(self.user_repo.get_user())
+        self.assertEqual(self.db.pool.stats(), before)
     
     def test_authenticate_user(self):
         """Test user authentication"""
@@ -209,6 +355,7 @@ class TestKnowledgeRepository(unittest.TestCase):
     def setUp(self):
         self.temp_dir = tempfile.mkdtemp()
         self.db_path = os.path.join(self.temp_dir, 'test.db')
+        _clone_template_db(self.db_path)
         self.db = NoxDatabase(self.db_path)
         self.knowledge_repo = KnowledgeRepository(self.db)
         self.user_repo = UserRepository(self.db)
@@ -242,7 +389,33 @@ class TestKnowledgeRepository(unittest.TestCase):
         self.assertIsNotNone(item)
         self.assertEqual(item['title'], 'Test Article')
         self.assertEqual(item['author_id'], self.user_id)
-    
+
+    def test_create_knowledge_items(self):
+        """Test bulk knowledge item creation"""
+        count = self.knowledge_repo.create_knowledge_items([
+            {'title': f'Article {i}', 'content': f'Content {i}', 'category': 'bulk',
+             'author_id': self.user_id, 'metadata': {'index': i}}
+            for i in range(5)
+        ])
+        self.assertEqual(count, 5)
+
+        results = self.knowledge_repo.search_knowledge_items('', category='bulk')
+        self.assertEqual(len(results), 5)
+        self.assertEqual(self.knowledge_repo.create_knowledge_items([]), 0)
+        self.assertEqual(self.knowledge_repo.create_knowledge_items(['not a dict']), 0)
+
+    def test_create_knowledge_items_skips_bad_items(self):
+        """Test one invalid item does not abort the rest of a bulk insert"""
+        items = [
+            {'title': f'Article {i}', 'content': f'Content {i}', 'category': 'mixed'}
+            for i in range(3)
+        ]
+        items.insert(1, {'title': None, 'content': 'No title', 'category': 'mixed'})
+
+        self.assertEqual(self.knowledge_repo.create_knowledge_items(items), 3)
+        results = self.knowledge_repo.search_knowledge_items('', category='mixed')
+        self.assertEqual(len(results), 3)
+
     def test_search_knowledge_items(self):
         """Test knowledge search functionality"""
         # Create test items
@@ -268,6 +441,7 @@ class TestConversationRepository(unittest.TestCase):
     def setUp(self):
         self.temp_dir = tempfile.mkdtemp()
         self.db_path = os.path.join(self.temp_dir, 'test.db')
+        _clone_template_db(self.db_path)
         self.db = NoxDatabase(self.db_path)
         self.conversation_repo = ConversationRepository(self.db)
         self.user_repo = UserRepository(self.db)
@@ -324,6 +498,7 @@ class TestSessionRepository(unittest.TestCase):
     def setUp(self):
         self.temp_dir = tempfile.mkdtemp()
         self.db_path = os.path.join(self.temp_dir, 'test.db')
+        _clone_template_db(self.db_path)
         self.db = NoxDatabase(self.db_path)
         self.session_repo = SessionRepository(self.db)
         self.user_repo = UserRepository(self.db)
@@ -370,6 +545,62 @@ class TestSessionRepository(unittest.TestCase):
         session = self.session_repo.get_session(session_id)
         self.assertIsNone(session)
 
+class TestAuditRepository(unittest.TestCase):
+    """Test audit repository functionality"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'test.db')
+        _clone_template_db(self.db_path)
+        self.db = NoxDatabase(self.db_path)
+        self.audit_repo = AuditRepository(self.db)
+        self.user_repo = UserRepository(self.db)
+        
+        # Create test user
+        self.user_id = self.user_repo.create_user('testuser', 'testpass')
+    
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.temp_dir)
+    
+    def test_log_actions(self):
+        """Test bulk audit logging"""
+        entries = [
+            {'user_id': self.user_id, 'action': 'login_failed', 'ip_address': '10.0.0.5'}
+            for _ in range(5)
+        ]
+        entries.append({'user_id': self.user_id, 'action': 'login', 'details': {'method': 'password'}})
+        
+        self.assertEqual(self.audit_repo.log_actions(entries), 6)
+        self.assertEqual(len(self.audit_repo.get_audit_logs(action='login_failed')), 5)
+        
+        logs = self.audit_repo.get_audit_logs(user_id=self.user_id, action='login')
+        self.assertEqual(logs[0]['details'], {'method': 'password'})
+        self.assertEqual(self.audit_repo.log_actions([None]), 0)
+    
+    def test_user_action_lookup_uses_index(self):
+        """Test per-user action history is read in timestamp order from an index"""
+        with self.db.get_connection() as conn:
+            plan = [row['detail'] for row in conn.execute("""
+                EXPLAIN QUERY PLAN
+                SELECT * FROM audit_logs WHERE user_id = ? AND action = ?
+                ORDER BY timestamp DESC
+            """, (self.user_id, 'login'))]
+        
+        self.assertIn('idx_audit_user_action', plan[0])
+        self.assertFalse(any('TEMP B-TREE' in step for step in plan))
+        
+        with self.db.get_connection() as conn:
+            indexes = {row['name'] for row in conn.execute("PRAGMA index_list(audit_logs)")}
+        self.assertNotIn('idx_audit_user', indexes)
+    
+    def test_log_actions_rollback(self):
+        """Test a bad entry rolls back the whole batch"""
+        entries = [{'user_id': self.user_id, 'action': 'login'}, {'user_id': self.user_id}]
+        
+        self.assertEqual(self.audit_repo.log_actions(entries), 0)
+        self.assertEqual(self.audit_repo.get_audit_logs(user_id=self.user_id), [])
+
 class TestDatabaseService(unittest.TestCase):
     """Test database service integration"""
     
@@ -398,7 +629,27 @@ class TestDatabaseService(unittest.TestCase):
         self.assertIn('database_size_bytes', status)
         self.assertIn('schema_version', status)
         self.assertIn('table_counts', status)
-    
+
+    def test_health_metrics_cached(self):
+        """Test health probes are reused within max_age"""
+        with mock.patch.object(self.db_service, '_probe_health',
+                               wraps=self.db_service._probe_health) as probe:
+            first = self.db_service.get_health_metrics(max_age=60)
+            self.assertEqual(first['health_status'], 'healthy')
+            
+            cached = self.db_service.get_health_metrics(max_age=60)
+            self.assertEqual(cached, first)
+            self.assertEqual(probe.call_count, 1)
+            
+            fresh = self.db_service.get_health_metrics(max_age=-1)
+            self.assertEqual(fresh['health_status'], 'healthy')
+            self.assertEqual(probe.call_count, 2)
+        
+        # Callers get their own copy; mutating it must not leak into the cache
+        fresh['connection_pool']['pool_size'] = -1
+        again = self.db_service.get_health_metrics(max_age=60)
+        self.assertNotEqual(again['connection_pool']['pool_size'], -1)
+
     def test_backup_restore(self):
         """Test database backup and restore"""
         # Create some test data
@@ -446,13 +697,12 @@ class TestDatabaseAdmin(unittest.TestCase):
         self.db_path = os.path.join(self.temp_dir, 'test.db')
         # Initialize database service first
         self.db_service = DatabaseService(self.db_path, auto_migrate=True)
+        # DatabaseAdmin uses the global service; drop any left by another test
+        close_database_service()
         self.admin = DatabaseAdmin(self.db_path)
     
     def tearDown(self):
-        try:
-            self.admin.db_service.close()
-        except:
-            pass
+        close_database_service()
         try:
             self.db_service.close()
         except:
@@ -502,33 +752,11 @@ class TestDatabaseAdmin(unittest.TestCase):
         self.assertIn('user_summary', report)
         self.assertIn('recommendations', report)
 
-def run_tests():
-    """Run all database tests"""
-    # Create test suite
-    test_classes = [
-        TestDatabaseConnectionPool,
-        TestNoxDatabase,
-        TestMigrationManager,
-        TestUserRepository,
-        TestKnowledgeRepository,
-        TestConversationRepository,
-        TestSessionRepository,
-        TestDatabaseService,
-        TestDatabaseAdmin
-    ]
-    
-    suite = unittest.TestSuite()
-    
-    for test_class in test_classes:
-        tests = unittest.TestLoader().loadTestsFromTestCase(test_class)
-        suite.addTests(tests)
-    
-    # Run tests
-    runner = unittest.TextTestRunner(verbosity=2)
-    result = runner.run(suite)
-    
-    return result.wasSuccessful()
-
 if __name__ == '__main__':
-    success = run_tests()
-    exit(0 if success else 1)
\ No newline at end of file
+    import importlib.util
+    import pytest
+    
+    args = [__file__]
+    if importlib.util.find_spec('xdist') is not None:
+        args[:0] = ['-n', 'auto']
+    sys.exit(pytest.main(args))